@@ -1,130 +1,418 @@
 import time
 import random
 import os
+import json
+import re
+import uuid
+import functools
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import google.generativeai as genai
+import orjson
+import redis
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
 from datetime import datetime
+from typing import Dict, List
+
+import msgspec
 
 # Load environment variables
 load_dotenv()
 
+# The Gemini key is boot-time config: resolve it once instead of on every request
+_GEMINI_KEY = os.getenv("GEMINI_API_KEY", "")
+_GEMINI_ENABLED = bool(_GEMINI_KEY) and "YOUR_GEMINI" not in _GEMINI_KEY
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; honours the same sort_keys/indent settings."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrJSONProvider(app)
+print(f"Gemini enabled: {_GEMINI_ENABLED}")
 
 # Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# REST (requests) rather than the default gRPC transport: gevent can patch its sockets,
+# while gRPC's C-core I/O would block a gevent worker's whole event loop.
+genai.configure(api_key=_GEMINI_KEY or None, transport="rest")
+# Use 'gemini-1.5-flash' which is the current standard. 
+# If 404s persist, check if API Key has access to this model in Google AI Studio.
+# Built once so every request reuses the same client and its connections.
+_MODEL = genai.GenerativeModel('gemini-1.5-flash') if _GEMINI_ENABLED else None
+
+# Configure Redis (optional): shared monitor store and API key registry
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_MAX_CONNECTIONS = 50 # Shared by request threads, MONITOR_POOL and JOB_POOL
+REDIS_POOL_TIMEOUT = 5 # Seconds to wait for a free connection once all are in use
+# Blocking pool: callers queue for a connection instead of failing with "Too many connections"
+redis_client = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(
+    REDIS_URL, decode_responses=True, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+)) if REDIS_URL else None
 
 from functools import wraps
 
+API_KEY_PREFIX = "ux_test_"
+API_KEYS_KEY = 'ux:apikeys' # Redis set of SHA-256 hex digests of issued keys
+
+def hash_api_key(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         api_key = request.headers.get('x-api-key')
-        if not api_key or not api_key.startswith("ux_test_"):
+        # The prefix check is a cheap pre-filter; with Redis the key itself must be registered.
+        # Only hashes are stored, so the lookup never compares plaintext secrets.
+        if not api_key or not api_key.startswith(API_KEY_PREFIX) or (
+                redis_client is not None and not redis_client.sismember(API_KEYS_KEY, hash_api_key(api_key))):
              return jsonify({"error": "Unauthorized. Invalid or missing API Key."}), 401
         return f(*args, **kwargs)
     return decorated_function
 
-def mock_scan(url):
+# --- Gemini Rate Limiting ---
+# Keep the deployment at 80% of the Gemini quota so bursts don't end in 429s.
+# GEMINI_RPM/GEMINI_TPM are the key's quota (defaults: free tier); the budget is split
+# evenly across GEMINI_PROCESSES, the number of processes sharing the key
+# (e.g. 5 for four gunicorn workers plus monitor.py).
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "30"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_PROCESSES = max(1, int(os.getenv("GEMINI_PROCESSES", "1")))
+RATE_LIMIT_WAIT = 5.0 # Max seconds a call waits for capacity before giving up
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1, timeout=0.0):
+        """Takes tokens, waiting up to timeout seconds. Returns False if they didn't free up in time."""
+        if self.rate <= 0:
+            return False # Zero budget: nothing is ever allowed
+        tokens = min(tokens, self.capacity)
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def release(self, tokens=1):
+        """Returns tokens taken by an acquire whose call never went out."""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + min(tokens, self.capacity))
+
+# Burst capacity is a quarter of the budget so no 60s window can exceed the quota itself
+_rpm_budget = GEMINI_RPM * 0.8 / GEMINI_PROCESSES
+_tpm_budget = GEMINI_TPM * 0.8 / GEMINI_PROCESSES
+_rpm_bucket = TokenBucket(rate=_rpm_budget / 60, capacity=max(1, _rpm_budget / 4))
+_tpm_bucket = TokenBucket(rate=_tpm_budget / 60, capacity=_tpm_budget / 4)
+
+def rate_limited(f):
+    """Holds Gemini calls to the RPM/TPM budget. Raises RuntimeError when out of capacity so callers use their fallback."""
+    @wraps(f)
+    def decorated_function(prompt, *args, **kwargs):
+        # One deadline for both buckets so a call never waits longer than RATE_LIMIT_WAIT in total
+        deadline = time.monotonic() + RATE_LIMIT_WAIT
+        if not _rpm_bucket.acquire(timeout=RATE_LIMIT_WAIT):
+            raise RuntimeError("Gemini rate limit budget exhausted")
+        # ~4 characters per token
+        if not _tpm_bucket.acquire(len(prompt) // 4, timeout=max(0.0, deadline - time.monotonic())):
+            _rpm_bucket.release()
+            raise RuntimeError("Gemini rate limit budget exhausted")
+        return f(prompt, *args, **kwargs)
+    return decorated_function
+
+@rate_limited
+def generate(prompt, **kwargs):
+    """Single entry point for Gemini generation requests."""
+    return _MODEL.generate_content(prompt, **kwargs)
+
+# Summary used when Gemini is disabled or the caller skipped it
+DEFAULT_SUMMARY = "Analysis complete. Optimization opportunities detected in Performance and Accessibility."
+
+# Gemini prompts, %-formatted with a categories dict
+SCORES_TMPL = "Performance %(performance)d, Accessibility %(accessibility)d, Best Practices %(best_practices)d, SEO %(seo)d"
+# Single-site summaries are cached per SCORE_BUCKET-rounded scores, so the prompt marks them approximate
+PROMPT_TMPL = "Write a professional 2-sentence executive summary for a UX audit with these approximate scores: " + SCORES_TMPL.replace("%(", "~%(") + ". Tone: Strategic and direct."
+BATCH_PROMPT_TMPL = "For each site below, write a professional 2-sentence executive summary for a UX audit with its scores. Tone: Strategic and direct. Respond with a JSON object mapping each site URL exactly as given to its summary.\n%s"
+
+SCORE_BUCKET = 5 # Scores are rounded to this step before caching (~1k keys instead of ~340k)
+
+def _bucket(score):
+    return (score + SCORE_BUCKET // 2) // SCORE_BUCKET * SCORE_BUCKET
+
+@functools.lru_cache(maxsize=4096)
+def _summary_for(performance, accessibility, best_practices, seo):
+    """Cached Gemini call: score tuples in the same buckets reuse the same summary."""
+    prompt = PROMPT_TMPL % {
+        "performance": performance,
+        "accessibility": accessibility,
+        "best_practices": best_practices,
+        "seo": seo
+    }
+    response = generate(prompt)
+    return response.text.strip()
+
+def gemini_summary(categories):
     """
-    Simulates a professional UX audit with balanced Pros/Cons analysis.
+    Generates the executive summary for a set of category scores.
+    Falls back to canned copy when Gemini is unavailable.
     """
-    time.sleep(2.0) 
-    
-    # Core Metrics
-    categories = {
-        "performance": random.randint(75, 98),
-        "accessibility": random.randint(65, 90),
-        "best_practices": random.randint(80, 100),
-        "seo": random.randint(70, 95)
-    }
-    overall_score = int(sum(categories.values()) / 4)
-    
-    # Executive Summary Data
-    summary_text = "Analysis complete. Optimization opportunities detected in Performance and Accessibility."
-    
+    summary_text = DEFAULT_SUMMARY
+
     # Try using Gemini for real summary if key exists
-    if os.getenv("GEMINI_API_KEY") and "YOUR_GEMINI" not in os.getenv("GEMINI_API_KEY"):
+    if _GEMINI_ENABLED:
         try:
-            # Use 'gemini-1.5-flash' which is the current standard. 
-            # If 404s persist, check if API Key has access to this model in Google AI Studio.
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = f"Write a professional 2-sentence executive summary for a UX audit with these scores: Performance {categories['performance']}, Accessibility {categories['accessibility']}, Best Practices {categories['best_practices']}, SEO {categories['seo']}. Tone: Strategic and direct."
-            response = model.generate_content(prompt)
-            summary_text = response.text.strip()
+            summary_text = _summary_for(
+                _bucket(categories['performance']),
+                _bucket(categories['accessibility']),
+                _bucket(categories['best_practices']),
+                _bucket(categories['seo'])
+            )
         except Exception as e:
             print(f"AI Summary Error: {e}")
             summary_text = "Standard Audit Complete: Analysis indicates solid performance metrics, though accessibility compliance requires attention. Recommended focus on color contrast and ARIA labels."
 
-    strengths = [
-        {
-            "category": "Performance",
-            "title": "Excellent Logical Paint",
-            "description": "The Largest Contentful Paint (LCP) is under 1.2s, ensuring an immediate visual response for users."
-        },
-        {
-            "category": "Design",
-            "title": "Clear Visual Hierarchy",
-            "description": "Heading structures (H1-H3) are correctly implemented, facilitating easy scanning of content."
-        },
-        {
-            "category": "Security",
-            "title": "HTTPS Enforced",
-            "description": "All traffic is securely encrypted using modern TLS 1.3 protocols."
-        },
-        {
-            "category": "Mobile",
-            "title": "Responsive Viewport",
-            "description": "The layout adapts fluidly to mobile viewports without horizontal scrolling."
-        }
-    ]
-
-    weaknesses = [
-        {
-            "severity": "High",
-            "title": "Insufficient Color Contrast",
-            "description": "Primary text elements fall below the WCAG AA standard ratio of 4.5:1, impacting readability for low-vision users.",
-            "recommendation": "Darken the text color to #334155 (Slate-700) or higher."
-        },
-        {
-            "severity": "Medium",
-            "title": "Missing Non-Text Alternatives",
-            "description": "Several key navigation images lack 'alt' attributes, rendering them invisible to screen readers.",
-            "recommendation": "Audit all <img> tags and apply descriptive alt text."
-        },
-        {
-            "severity": "Medium",
-            "title": "Unoptimized JavaScript Chunks",
-            "description": "Large JS bundles are blocking the main thread for over 250ms, causing input delay.",
-            "recommendation": "Implement code-splitting and defer non-critical scripts."
-        },
-        {
-            "severity": "Low",
-            "title": "Tap Targets Too Small",
-            "description": "Mobile menu links have a hit area smaller than 48x48px, leading to potential 'fat finger' errors.",
-            "recommendation": "Increase padding on .nav-link elements."
-        }
-    ]
+    return summary_text
+
+# (category, min, max) score ranges for the simulated audit
+SCORE_RANGES = (
+    ("performance", 75, 98),
+    ("accessibility", 65, 90),
+    ("best_practices", 80, 100),
+    ("seo", 70, 95)
+)
+
+# --- Scan Report Schema ---
+# Every report has the same shape, so msgspec generates a dedicated encoder for it
+# instead of walking generic dicts.
+class Strength(msgspec.Struct, frozen=True):
+    category: str
+    title: str
+    description: str
+
+class Weakness(msgspec.Struct, frozen=True):
+    severity: str
+    title: str
+    description: str
+    recommendation: str
+
+class ScanResult(msgspec.Struct):
+    url: str
+    timestamp: str
+    score: int
+    categories: Dict[str, int]
+    summary: str
+    strengths: List[Strength]
+    weaknesses: List[Weakness]
+
+_json_encoder = msgspec.json.Encoder()
+
+def struct_response(obj, status=200):
+    """JSON response for ScanResult (or plain containers holding one), encoded with msgspec."""
+    return Response(_json_encoder.encode(obj), status=status, mimetype='application/json')
+
+# Findings the simulated audit picks from; shared tuples of frozen structs
+_STRENGTHS = (
+    Strength(
+        category="Performance",
+        title="Excellent Logical Paint",
+        description="The Largest Contentful Paint (LCP) is under 1.2s, ensuring an immediate visual response for users."
+    ),
+    Strength(
+        category="Design",
+        title="Clear Visual Hierarchy",
+        description="Heading structures (H1-H3) are correctly implemented, facilitating easy scanning of content."
+    ),
+    Strength(
+        category="Security",
+        title="HTTPS Enforced",
+        description="All traffic is securely encrypted using modern TLS 1.3 protocols."
+    ),
+    Strength(
+        category="Mobile",
+        title="Responsive Viewport",
+        description="The layout adapts fluidly to mobile viewports without horizontal scrolling."
+    )
+)
+
+_WEAKNESSES = (
+    Weakness(
+        severity="High",
+        title="Insufficient Color Contrast",
+        description="Primary text elements fall below the WCAG AA standard ratio of 4.5:1, impacting readability for low-vision users.",
+        recommendation="Darken the text color to #334155 (Slate-700) or higher."
+    ),
+    Weakness(
+        severity="Medium",
+        title="Missing Non-Text Alternatives",
+        description="Several key navigation images lack 'alt' attributes, rendering them invisible to screen readers.",
+        recommendation="Audit all <img> tags and apply descriptive alt text."
+    ),
+    Weakness(
+        severity="Medium",
+        title="Unoptimized JavaScript Chunks",
+        description="Large JS bundles are blocking the main thread for over 250ms, causing input delay.",
+        recommendation="Implement code-splitting and defer non-critical scripts."
+    ),
+    Weakness(
+        severity="Low",
+        title="Tap Targets Too Small",
+        description="Mobile menu links have a hit area smaller than 48x48px, leading to potential 'fat finger' errors.",
+        recommendation="Increase padding on .nav-link elements."
+    )
+)
+
+# Every ordered pick of 3 out of 4 findings; random.choice over these matches random.sample(k=3)
+_PICKS = tuple(itertools.permutations(range(4), 3))
+
+MONITOR_BATCH_SIZE = 25 # Sites summarized per Gemini request
+# The monitor dashboard doesn't show summaries, so the tick only pays for them when asked to
+MONITOR_SUMMARIES = os.getenv("MONITOR_SUMMARIES", "").lower() in ("1", "true", "yes")
+
+def batch_summaries(items):
+    """
+    Summarizes many (url, categories) pairs with one Gemini request per
+    MONITOR_BATCH_SIZE sites instead of one request per site.
+    Returns {url: summary}; sites missing from the result keep their old summary.
+    """
+    summaries = {}
+    if not _GEMINI_ENABLED or not items:
+        return summaries
+
+    for start in range(0, len(items), MONITOR_BATCH_SIZE):
+        chunk = items[start:start + MONITOR_BATCH_SIZE]
+        lines = "\n".join("- %s: %s" % (url, SCORES_TMPL % categories) for url, categories in chunk)
+        prompt = BATCH_PROMPT_TMPL % lines
+        try:
+            response = generate(prompt, generation_config={"response_mime_type": "application/json"})
+            summaries.update({url: str(text).strip() for url, text in json.loads(response.text).items()})
+        except Exception as e:
+            print(f"AI Batch Summary Error: {e}")
+
+    return summaries
+
+def mock_scan(url, want_summary=True):
+    """
+    Simulates a professional UX audit with balanced Pros/Cons analysis.
+    With want_summary=False the Gemini call is skipped and the default summary is kept.
+    """
+    # Simulated latency is opt-in for local demos only
+    if app.debug and os.getenv("UX_SIMULATE_LATENCY"):
+        time.sleep(2.0)
+    
+    # Core Metrics
+    rand = random.random
+    categories = {key: lo + int(rand() * (hi - lo + 1)) for key, lo, hi in SCORE_RANGES}
+    overall_score = sum(categories.values()) >> 2
     
+    # Executive Summary Data
+    if want_summary:
+        summary_text = gemini_summary(categories)
+    else:
+        summary_text = DEFAULT_SUMMARY
+
     # Select random subset for variety
-    active_strengths = random.sample(strengths, k=3)
-    active_weaknesses = random.sample(weaknesses, k=3)
+    active_strengths = [_STRENGTHS[i] for i in random.choice(_PICKS)]
+    active_weaknesses = [_WEAKNESSES[i] for i in random.choice(_PICKS)]
     
-    result = {
-        "url": url,
-        "timestamp": time.strftime("%Y-%m-%d %H:%M UTC"),
-        "score": overall_score,
-        "categories": categories,
-        "summary": summary_text,
-        "strengths": active_strengths,
-        "weaknesses": active_weaknesses
-    }
+    result = ScanResult(
+        url=url,
+        timestamp=time.strftime("%Y-%m-%d %H:%M UTC"),
+        score=overall_score,
+        categories=categories,
+        summary=summary_text,
+        strengths=active_strengths,
+        weaknesses=active_weaknesses
+    )
     
     return result
 
+# --- Background Jobs ---
+# With REDIS_URL set, job state lives in ux:job:{id} (JSON, expires after JOB_TTL) so any
+# worker can answer a poll. Without it, jobs are only visible to the process that ran them.
+JOB_POOL = ThreadPoolExecutor(max_workers=8)
+JOBS = OrderedDict() # In-memory store: job_id -> Future (oldest evicted first)
+MAX_JOBS = 1024
+JOB_TTL = 3600 # Seconds a finished (or abandoned) job stays in Redis
+_jobs_lock = threading.Lock()
+
+def _job_key(job_id):
+    return f'ux:job:{job_id}'
+
+def _run_job(job_id, func, *args):
+    """Runs func and records its outcome in Redis for whichever worker gets polled."""
+    try:
+        state = {"job_id": job_id, "state": "SUCCESS", "result": func(*args)}
+    except Exception as e:
+        print(f"Job Error for {job_id}: {e}")
+        state = {"job_id": job_id, "state": "FAILURE", "error": str(e)}
+    redis_client.set(_job_key(job_id), _json_encoder.encode(state), ex=JOB_TTL)
+
+def submit_job(func, *args):
+    """Runs func on the job pool and returns a job_id the client can poll."""
+    job_id = uuid.uuid4().hex
+    if redis_client is not None:
+        redis_client.set(_job_key(job_id), _json_encoder.encode({"job_id": job_id, "state": "PENDING"}), ex=JOB_TTL)
+        JOB_POOL.submit(_run_job, job_id, func, *args)
+        return job_id
+
+    with _jobs_lock:
+        JOBS[job_id] = JOB_POOL.submit(func, *args)
+        while len(JOBS) > MAX_JOBS:
+            JOBS.popitem(last=False)
+    return job_id
+
+def complete_scan(partial):
+    """Job body: attaches the Gemini summary to a scan produced without one."""
+    return msgspec.structs.replace(partial, summary=gemini_summary(partial.categories))
+
+def scan_response(url, data, allow_async=False):
+    """
+    Returns the scan for url. When allow_async is set and the caller asks for
+    {"async": true}, the scores come back immediately with a 202 and the summary
+    is finished in the background under /api/v1/jobs/<job_id>. Only the keyed
+    API allows this, since polling that route needs an API key. With ?slim=1 or {"slim": true}
+    the Gemini summary is skipped entirely and the default summary is returned.
+    """
+    if request.args.get('slim') in ('1', 'true') or data.get('slim'):
+        return struct_response(mock_scan(url, want_summary=False))
+    if allow_async and data.get('async'):
+        partial = mock_scan(url, want_summary=False)
+        job_id = submit_job(complete_scan, partial)
+        return struct_response({"job_id": job_id, "partial": partial}, status=202)
+    return struct_response(mock_scan(url))
+
 @app.route('/')
 def index():
     clerk_key = os.getenv("CLERK_PUBLISHABLE_KEY", "pk_test_placeholder")
@@ -135,27 +423,73 @@ def analyze():
     data = request.json
     url = data.get('url')
     if not url: return jsonify({"error": "URL required"}), 400
-    return jsonify(mock_scan(url))
+    return scan_response(url, data)
+
+_CODEFENCE = re.compile(r'```\w*') # Markdown fences (```css, ```, ...) around generated code
+_FENCE_TAIL = re.compile(r'`+\w*$') # Trailing backticks that may be a fence split across stream chunks
+
+MOCK_FIX = "/* Mock Fix (Gemini Key Missing) */\n.nav-link {\n  padding: 12px 24px;\n}"
+FALLBACK_FIX = "/* AI Unavailable - Using Fallback */\n.text-element {\n  color: #1a1a1a; /* Darkened for contrast */\n}"
+
+FIX_PROMPT = "Provide a CSS fix for: 'Insufficient Color Contrast. Primary text elements fall below WCAG AA standard ratio of 4.5:1. Recommendation: Darken text color'. Return ONLY the CSS code block."
+
+def _sse(text):
+    """Formats text as one server-sent event, one data: field per line."""
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+def _stream_fix(response):
+    """Relays a streamed Gemini response as server-sent events, ending with a 'done' event."""
+    pending = "" # Possible start of a code fence, held until the next chunk completes it
+    try:
+        for chunk in response:
+            text = pending + chunk.text
+            tail = _FENCE_TAIL.search(text)
+            cut = tail.start() if tail else len(text)
+            text, pending = _CODEFENCE.sub('', text[:cut]), text[cut:]
+            if text:
+                yield _sse(text)
+        # Backticks left dangling at the very end are a truncated closing fence
+        text = _CODEFENCE.sub('', pending).rstrip('`')
+        if text:
+            yield _sse(text)
+    except Exception as e:
+        print(f"AI Fix Stream Error: {e}")
+        yield "event: error\n" + _sse("AI Unavailable")
+    yield "event: done\ndata:\n\n"
+
+def _sse_fix(fix_code):
+    """Complete server-sent event response carrying a canned fix."""
+    return Response(_sse(fix_code) + "event: done\ndata:\n\n", mimetype='text/event-stream')
 
 @app.route('/fix', methods=['POST'])
 def fix_issue():
+    # Clients that accept server-sent events get the fix (and any fallback) as an event stream
+    wants_stream = 'text/event-stream' in request.headers.get('Accept', '')
+
     # If API Key is missing, fallback to mock
-    if not os.getenv("GEMINI_API_KEY") or "YOUR_GEMINI" in os.getenv("GEMINI_API_KEY"):
+    if not _GEMINI_ENABLED:
         time.sleep(1.0)
+        if wants_stream:
+            return _sse_fix(MOCK_FIX)
         return jsonify({
             "status": "success",
-            "fix": "/* Mock Fix (Gemini Key Missing) */\n.nav-link {\n  padding: 12px 24px;\n}"
+            "fix": MOCK_FIX
         })
 
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content("Provide a CSS fix for: 'Insufficient Color Contrast. Primary text elements fall below WCAG AA standard ratio of 4.5:1. Recommendation: Darken text color'. Return ONLY the CSS code block.")
-        fix_code = response.text.replace('```css', '').replace('```', '').strip()
+        if wants_stream:
+            response = generate(FIX_PROMPT, stream=True)
+            return Response(stream_with_context(_stream_fix(response)), mimetype='text/event-stream')
+
+        response = generate(FIX_PROMPT)
+        fix_code = _CODEFENCE.sub('', response.text).strip()
         return jsonify({"status": "success", "fix": fix_code})
     except Exception as e:
         print(f"AI Fix Error: {e}")
         # Fallback if AI fails so the UI doesn't break
-        return jsonify({"status": "success", "fix": "/* AI Unavailable - Using Fallback */\n.text-element {\n  color: #1a1a1a; /* Darkened for contrast */\n}"})
+        if wants_stream:
+            return _sse_fix(FALLBACK_FIX)
+        return jsonify({"status": "success", "fix": FALLBACK_FIX})
 
 # --- Public API v1 ---
 
@@ -175,8 +509,24 @@ def api_scan():
     if not url: return jsonify({"error": "URL required"}), 400
     
     # Reuse the internal logic
-    result = mock_scan(url)
-    return jsonify(result)
+    return scan_response(url, data, allow_async=True)
+
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+@require_api_key
+def api_job(job_id):
+    if redis_client is not None:
+        state = redis_client.get(_job_key(job_id))
+        if state is None: return jsonify({"error": "Unknown job"}), 404
+        return Response(state, mimetype='application/json')
+
+    future = JOBS.get(job_id)
+    if future is None: return jsonify({"error": "Unknown job"}), 404
+
+    if not future.done():
+        return jsonify({"job_id": job_id, "state": "PENDING"})
+    if future.exception() is not None:
+        return jsonify({"job_id": job_id, "state": "FAILURE", "error": str(future.exception())})
+    return struct_response({"job_id": job_id, "state": "SUCCESS", "result": future.result()})
 
 @app.route('/api/v1/fix', methods=['POST'])
 @require_api_key
@@ -192,51 +542,193 @@ def api_fix():
 
 
 # --- Monitoring System ---
-MONITORED_SITES = [] # In-memory store: {url, status, score, last_check, history}
+# With REDIS_URL set, monitors are shared by every worker process:
+#   ux:sites        set of monitored URLs (O(1) dedupe)
+#   ux:site:{url}   hash with url, score, status, last_check, summary
+#   ux:sites:version counter bumped on every change (the /api/monitor ETag)
+#   ux:sites:epoch  random id created with the counter, so a reset counter can't reuse old ETags
+# Without it, sites live in this process only.
+SITES_KEY = 'ux:sites'
+VERSION_KEY = 'ux:sites:version'
+EPOCH_KEY = 'ux:sites:epoch'
+MONITORED_SITES = {} # In-memory store: url -> {url, status, score, last_check, summary}
+
+# In-memory version; the boot id keeps ETags from a previous run from matching
+_BOOT_ID = uuid.uuid4().hex[:8]
+_version_counter = itertools.count(1)
+_sites_version = 0
+
+def _bump_version():
+    global _sites_version
+    _sites_version = next(_version_counter)
+
+def sites_version():
+    """Returns a token that changes whenever any monitored site is added, removed or updated."""
+    if redis_client is None:
+        return f'{_BOOT_ID}-{_sites_version}'
+
+    epoch, version = redis_client.mget(EPOCH_KEY, VERSION_KEY)
+    if epoch is None:
+        # First use, or Redis lost its data: start a new epoch (NX so workers agree on one)
+        redis_client.set(EPOCH_KEY, uuid.uuid4().hex[:8], nx=True)
+        epoch = redis_client.get(EPOCH_KEY)
+    return f'{epoch}-{version or 0}'
+
+def _site_key(url):
+    return f'ux:site:{url}'
+
+# Membership check + write run as one Lua script, so a concurrent remove can't
+# leave an orphan ux:site:{url} hash behind.
+# KEYS: sites set, site hash, version counter. ARGV: url, field1, value1, ...
+_ADD_SITE_LUA = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then return 0 end
+redis.call('HSET', KEYS[2], unpack(ARGV, 2))
+redis.call('INCR', KEYS[3])
+return 1
+"""
+_SAVE_SITE_LUA = """
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 0 then return 0 end
+redis.call('HSET', KEYS[2], unpack(ARGV, 2))
+redis.call('INCR', KEYS[3])
+return 1
+"""
+_add_site_script = redis_client.register_script(_ADD_SITE_LUA) if redis_client is not None else None
+_save_site_script = redis_client.register_script(_SAVE_SITE_LUA) if redis_client is not None else None
+
+def _site_script_args(site):
+    return [site['url']] + [part for item in site.items() for part in item]
+
+def list_sites():
+    """Returns every monitored site record."""
+    if redis_client is None:
+        # Snapshot so callers can iterate while sites are added or removed
+        return list(MONITORED_SITES.values())
+
+    pipe = redis_client.pipeline()
+    for url in sorted(redis_client.smembers(SITES_KEY)):
+        pipe.hgetall(_site_key(url))
+    sites = [site for site in pipe.execute() if site]
+    for site in sites:
+        site['score'] = int(site.get('score', 0))
+    return sites
+
+def add_site(url):
+    """Starts monitoring url. Returns False if it is already monitored."""
+    site = {
+        'url': url,
+        'score': 0,
+        'status': 'Pending',
+        'last_check': 'Never'
+    }
+    if redis_client is None:
+        if url in MONITORED_SITES:
+            return False
+        MONITORED_SITES[url] = site
+        _bump_version()
+        return True
+
+    return _add_site_script(keys=[SITES_KEY, _site_key(url), VERSION_KEY], args=_site_script_args(site)) == 1
+
+def remove_site(url):
+    """Stops monitoring url."""
+    if redis_client is None:
+        MONITORED_SITES.pop(url, None)
+        _bump_version()
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.srem(SITES_KEY, url)
+    pipe.delete(_site_key(url))
+    pipe.incr(VERSION_KEY)
+    pipe.execute()
+
+def save_site(site):
+    """Persists an updated site record (in-memory records are already updated in place)."""
+    if redis_client is None:
+        _bump_version()
+        return
+    # Don't resurrect a site that was removed while it was being scanned
+    _save_site_script(keys=[SITES_KEY, _site_key(site['url']), VERSION_KEY], args=_site_script_args(site))
+
+MONITOR_POOL = ThreadPoolExecutor(max_workers=16) # Sites are scanned concurrently each tick
+
+def _scan_one(site):
+    """
+    Scans one monitored site and updates its record in place.
+    Returns (url, categories) for the optional batched summary, or None on error.
+    """
+    try:
+        # Perform a scan (using our internal logic)
+        # Summaries (if MONITOR_SUMMARIES is on) come afterwards in one batched Gemini request
+        result = mock_scan(site['url'], want_summary=False)
+        
+        # Update Status
+        new_score = result.score
+        old_score = site.get('score', 0)
+        
+        status = 'Healthy'
+        if new_score < 50: status = 'Critical'
+        elif new_score < 70: status = 'Warning'
+        
+        # Update Site Record
+        site['score'] = new_score
+        site['status'] = status
+        site['last_check'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Simple Alert Logic (Console for now)
+        if new_score < old_score - 10:
+             print(f"ALERT: Score dropped for {site['url']} from {old_score} to {new_score}")
+        
+        return site['url'], result.categories
+             
+    except Exception as e:
+        print(f"Monitor Error for {site['url']}: {e}")
+        site['status'] = 'Error'
+        return None
 
 def check_monitored_sites():
     """Background task to check all monitored sites."""
-    global MONITORED_SITES
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Running Background Monitor Check...")
     
-    for site in MONITORED_SITES:
-        try:
-            # Perform a scan (using our internal logic)
-            # For efficiency in this demo, we mock it or use the lightweight mock
-            result = mock_scan(site['url'])
-            
-            # Update Status
-            new_score = result['score']
-            old_score = site.get('score', 0)
-            
-            status = 'Healthy'
-            if new_score < 50: status = 'Critical'
-            elif new_score < 70: status = 'Warning'
-            
-            # Update Site Record
-            site['score'] = new_score
-            site['status'] = status
-            site['last_check'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Simple Alert Logic (Console for now)
-            if new_score < old_score - 10:
-                 print(f"ALERT: Score dropped for {site['url']} from {old_score} to {new_score}")
-                 
-        except Exception as e:
-            print(f"Monitor Error for {site['url']}: {e}")
-            site['status'] = 'Error'
+    sites = list_sites()
+    scanned = [item for item in MONITOR_POOL.map(_scan_one, sites) if item]
+
+    if MONITOR_SUMMARIES:
+        summaries = batch_summaries(scanned)
+        for site in sites:
+            if site['url'] in summaries:
+                site['summary'] = summaries[site['url']]
+    list(MONITOR_POOL.map(save_site, sites))
+
+def schedule_monitor(scheduler):
+    """Registers the 30s monitor tick on an APScheduler scheduler."""
+    # A tick that overruns the interval is skipped rather than queued behind the running one
+    scheduler.add_job(func=check_monitored_sites, trigger="interval", seconds=30,
+                      max_instances=1, coalesce=True, misfire_grace_time=10)
 
 # Start Scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(func=check_monitored_sites, trigger="interval", seconds=30)
-scheduler.start()
+# The in-memory store only exists in this process, so the monitor has to run here.
+# With Redis the monitor runs once in its own process instead (python monitor.py),
+# so it isn't duplicated per web worker.
+if redis_client is None:
+    scheduler = BackgroundScheduler()
+    schedule_monitor(scheduler)
+    scheduler.start()
 
-# Shut down the scheduler when exiting the app
-atexit.register(lambda: scheduler.shutdown())
+    # Shut down the scheduler when exiting the app
+    atexit.register(lambda: scheduler.shutdown())
 
 @app.route('/api/monitor', methods=['GET'])
 def get_monitors():
-    return jsonify(MONITORED_SITES)
+    # Dashboards poll this; when nothing changed, answer 304 without listing or serializing
+    etag = sites_version()
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = jsonify(list_sites())
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache' # Always revalidate
+    return resp
 
 @app.route('/api/monitor/add', methods=['POST'])
 def add_monitor():
@@ -245,15 +737,8 @@ def add_monitor():
     if not url: return jsonify({'error': 'URL required'}), 400
     
     # Check duplicate
-    if any(s['url'] == url for s in MONITORED_SITES):
+    if not add_site(url):
         return jsonify({'error': 'Already monitored'}), 400
-        
-    MONITORED_SITES.append({
-        'url': url,
-        'score': 0,
-        'status': 'Pending',
-        'last_check': 'Never'
-    })
     
     # Trigger immediate check (async in real world, sync here for demo feel)
     # threading.Thread(target=check_monitored_sites).start() 
@@ -263,8 +748,8 @@ def add_monitor():
 def remove_monitor():
     data = request.json
     url = data.get('url')
-    global MONITORED_SITES
-    MONITORED_SITES = [s for s in MONITORED_SITES if s['url'] != url]
+    if not url: return jsonify({'error': 'URL required'}), 400
+    remove_site(url)
     return jsonify({'success': True})
 
 
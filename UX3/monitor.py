@@ -0,0 +1,21 @@
+# Standalone site monitor:
+#   python monitor.py
+#
+# Runs the monitoring tick exactly once no matter how many web workers serve
+# app.py. Requires REDIS_URL so this process and the workers share the
+# monitored sites; without it the app runs the monitor in-process.
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from app import redis_client, schedule_monitor
+
+if __name__ == '__main__':
+    if redis_client is None:
+        raise SystemExit("REDIS_URL is not set; the monitor already runs inside app.py.")
+
+    scheduler = BlockingScheduler()
+    schedule_monitor(scheduler)
+    print("Site monitor started. Press Ctrl+C to exit.")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
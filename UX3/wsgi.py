@@ -0,0 +1,10 @@
+# Production entry point:
+#   gunicorn -k gevent -w 4 --worker-connections 1000 wsgi:app
+#
+# Monkey-patching must happen before the app (and the Gemini client) is
+# imported so their sockets and threads become cooperative. app.py configures
+# Gemini with the REST transport, which goes through the patched socket layer.
+from gevent import monkey
+monkey.patch_all()
+
+from app import app  # noqa: E402